@@ -25,6 +25,10 @@ import sys
 import time
 import os
 import re
+import select
+import queue
+import threading
+import atexit
 from datetime import datetime
 
 # =============================================================================
@@ -46,6 +50,48 @@ from datetime import datetime
 # Global log file path
 LOG_FILE = "emmc_mount_check.log"
 
+# Log file handle, opened once by open_log() and closed at exit
+LOG_FH = None
+
+# Separator line written after each log entry
+LOG_SEPARATOR = "\n" + "=" * 80 + "\n"
+
+# Pipe buffer size for the adb shell subprocess (Linux default max: 1 MiB)
+PIPE_SIZE = 1024 * 1024
+
+# Set to False when `adb shell` gives direct shell access without a login
+# prompt (e.g. adb key authentication); the check then runs as a single
+# non-interactive `adb shell "<commands>"` call.
+ADB_LOGIN_REQUIRED = True
+
+# Linux shell commands to check if mount path is mounted
+MOUNT_CHECK_COMMANDS = [
+    "df -h | grep emmc_mount  || echo '/mnt/emmc_mount not found'",
+    "mount | grep emmc_mount || echo '/mnt/emmc_mount not mounted'",
+    "cat /proc/mounts | grep emmc_mount || true"
+]
+
+# Marker printed between the outputs of the batched commands
+BATCH_SEPARATOR = "@@SEP@@"
+
+# NFS indicators in mount information: "nfs"/"nfs4" or a "host:port/" source
+NFS_RE = re.compile(r"\bnfs4?\b|:[0-9]+/", re.IGNORECASE)
+
+# -----------------------------------------------------------------------------
+# Function: open_log
+# Purpose : Open the log file once for appending, writing a header if the
+#           file is new. The handle is closed (and flushed) at exit.
+# -----------------------------------------------------------------------------
+def open_log():
+    """Open the log file once and return its handle"""
+    global LOG_FH
+    if LOG_FH is None:
+        LOG_FH = open(LOG_FILE, 'a', buffering=8192)
+        atexit.register(LOG_FH.close)
+        if LOG_FH.tell() == 0:
+            LOG_FH.write("eMMC Mount Check Log" + LOG_SEPARATOR)
+    return LOG_FH
+
 # -----------------------------------------------------------------------------
 # Function: save_to_log
 # Purpose : Append content to the specified log file with separator lines.
@@ -54,9 +100,270 @@ LOG_FILE = "emmc_mount_check.log"
 # -----------------------------------------------------------------------------
 def save_to_log(content):
     """Append content to the log file, with separator lines"""
-    with open(LOG_FILE, 'a') as f:
-        f.write(content)
-        f.write("\n" + "=" * 80 + "\n")
+    log_fh = open_log()
+    log_fh.write(content)
+    log_fh.write(LOG_SEPARATOR)
+
+# -----------------------------------------------------------------------------
+# Function: echo_marker
+# Purpose : Return a shell echo command printing the given marker. The marker
+#           is quoted with an empty '' in the middle so that the terminal echo
+#           of the command line itself never matches it.
+# Arguments:
+#   marker (str): Marker to print.
+# -----------------------------------------------------------------------------
+def echo_marker(marker):
+    """Build an echo command for a batch marker"""
+    return f"echo '{marker[:3]}''{marker[3:]}'"
+
+# -----------------------------------------------------------------------------
+# Function: build_batch_command
+# Purpose : Join the mount-check commands into one compound shell line, with a
+#           separator echoed between outputs and an end marker echoed last.
+# Arguments:
+#   done_marker (str): Unique marker that terminates the batch output.
+# -----------------------------------------------------------------------------
+def build_batch_command(done_marker):
+    """Build a single shell line running all mount-check commands"""
+    separator_echo = echo_marker(BATCH_SEPARATOR)
+    return f"; {separator_echo}; ".join(MOUNT_CHECK_COMMANDS) + f"; {echo_marker(done_marker)}"
+
+# -----------------------------------------------------------------------------
+# Function: format_batch_output
+# Purpose : Split the output of a batched command back into per-command
+#           sections, formatted for the log. The terminal echo of the command
+#           line (interactive shells only) is dropped first.
+# Arguments:
+#   batch_output (str): Raw output captured for the batched command.
+#   done_marker (str): End marker passed to build_batch_command.
+# -----------------------------------------------------------------------------
+def format_batch_output(batch_output, done_marker):
+    """Format the batched command output as one section per command"""
+    echoed = batch_output.find(echo_marker(done_marker))
+    if echoed != -1:
+        line_end = batch_output.find("\n", echoed)
+        batch_output = batch_output[line_end + 1:] if line_end != -1 else ""
+
+    outputs = batch_output.split(done_marker)[0].split(BATCH_SEPARATOR)
+    outputs += [""] * (len(MOUNT_CHECK_COMMANDS) - len(outputs))
+
+    all_output = ""
+    for cmd, output in zip(MOUNT_CHECK_COMMANDS, outputs):
+        all_output += f"Command: {cmd}\nOutput:\n{output.strip()}\n\n"
+
+    return all_output.strip()
+
+# -----------------------------------------------------------------------------
+# Function: detect_nfs_mount
+# Purpose : Analyze whether NFS is detected in the mount information.
+# Arguments:
+#   command_output (str): Formatted output of the mount-check commands.
+# -----------------------------------------------------------------------------
+def detect_nfs_mount(command_output):
+    """Return the NFS mount result for the given command output"""
+    if NFS_RE.search(command_output):
+        return "Yes"
+    if "emmc_mount" in command_output:
+        return "No"
+    return "Unknown (/mnt/emmc_mount not found)"
+
+# -----------------------------------------------------------------------------
+# Function: report_result
+# Purpose : Save the check result to the log file and print a summary.
+# -----------------------------------------------------------------------------
+def report_result(timestamp, login_status, mount_result, command_output):
+    """Log and display the result of one mount check"""
+    # Format and save log
+    log_content = (
+        f"[Check Time] {timestamp}\n"
+        f"[Login Status] {login_status}\n"
+        f"[NFS Mounted] {mount_result}\n\n"
+        f"[Command Output]\n{command_output}\n"
+    )
+
+    save_to_log(log_content)
+    print(f"\nCheck complete! Results saved to: {LOG_FILE}")
+
+    # Display summary
+    print("\n" + "=" * 40)
+    print(f"Time: {timestamp}")
+    print(f"Login: {login_status}")
+    print(f"NFS Mounted: {mount_result}")
+    print("=" * 40)
+
+# -----------------------------------------------------------------------------
+# Function: check_adb_device
+# Purpose : Probe the device state with `adb get-state`, which answers
+#           immediately, so a missing device is reported without waiting
+#           for the login timeout. The adb server is started first, since a
+#           cold start can take longer than the probe timeout.
+# Returns :
+#   None if a device is connected, otherwise the reason it is not usable.
+# -----------------------------------------------------------------------------
+def check_adb_device():
+    """Return None if an ADB device is connected, otherwise an error message"""
+    try:
+        subprocess.run(
+            ['adb', 'start-server'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=10
+        )
+        result = subprocess.run(
+            ['adb', 'get-state'],
+            capture_output=True,
+            text=True,
+            errors='replace',
+            timeout=2
+        )
+    except subprocess.TimeoutExpired:
+        return None  # a slow adb is not proof of a missing device
+    except OSError as e:
+        return str(e)
+
+    # Any state with a usable shell is accepted; "device" in normal boot,
+    # "recovery" when the TBox booted into recovery
+    state = result.stdout.strip()
+    if result.returncode != 0 or state not in ("device", "recovery"):
+        return (
+            result.stderr.strip()
+            or state
+            or f"adb get-state exited with code {result.returncode}"
+        )
+    return None
+
+# -----------------------------------------------------------------------------
+# Function: adb_shell_oneshot
+# Purpose : Runs the batched mount-check commands with a single
+#           non-interactive `adb shell` call, for devices that do not
+#           require a login. The results are saved to log and printed on-screen.
+# -----------------------------------------------------------------------------
+def adb_shell_oneshot():
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    login_status = "Not required"
+    mount_result = ""
+    command_output = ""
+
+    try:
+        print("Checking mount status of /mnt/emmc_mount...")
+        done_marker = f"@@DONE-{os.urandom(4).hex()}@@"
+        result = subprocess.run(
+            ['adb', 'shell', build_batch_command(done_marker)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors='replace',
+            timeout=10
+        )
+        sys.stdout.write(result.stdout)
+
+        if result.returncode != 0:
+            command_output = result.stdout.strip()
+            mount_result = f"Error: adb shell exited with code {result.returncode}"
+            return
+
+        command_output = format_batch_output(result.stdout, done_marker)
+        mount_result = detect_nfs_mount(command_output)
+
+    except Exception as e:
+        print(f"\nException occurred: {str(e)}")
+        mount_result = f"Error: {str(e)}"
+
+    finally:
+        report_result(timestamp, login_status, mount_result, command_output)
+
+# -----------------------------------------------------------------------------
+# Class   : PipeReader
+# Purpose : Waits for output on a subprocess pipe with a timeout and returns
+#           everything available in one go. On POSIX the pipe is put into
+#           non-blocking mode and waited on with select(); on Windows, where
+#           select() does not accept pipes, a reader thread feeds a queue.
+# -----------------------------------------------------------------------------
+class PipeReader:
+    """Timed bulk reads from a subprocess pipe (POSIX and Windows)"""
+
+    def __init__(self, pipe):
+        self.fd = pipe.fileno()
+        self.queue = None
+
+        if os.name == "posix":
+            import fcntl
+            flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+            fcntl.fcntl(self.fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        else:
+            self.queue = queue.Queue()
+            threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self):
+        """Windows reader thread: forward chunks to the queue, b'' at EOF"""
+        while True:
+            try:
+                chunk = os.read(self.fd, 65536)
+            except OSError:
+                chunk = b''
+            self.queue.put(chunk)
+            if not chunk:
+                return
+
+    def read(self, timeout):
+        """Wait up to timeout seconds and return all available output.
+
+        Returns None on timeout and b'' once the pipe has reached EOF.
+        """
+        if self.queue is None:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            if not ready:
+                return None
+
+            # Drain everything currently available; EOF stays readable, so
+            # it is reported by the next call if data was read first
+            data = bytearray()
+            while True:
+                try:
+                    chunk = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    # Spurious wakeup if nothing was read: not EOF
+                    return bytes(data) if data else None
+                if not chunk:
+                    return bytes(data)
+                data += chunk
+
+        try:
+            chunk = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        data = bytearray(chunk)
+        while chunk:
+            try:
+                chunk = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if not chunk:
+                self.queue.put(b'')  # report EOF on the next call
+                break
+            data += chunk
+        return bytes(data)
+
+# -----------------------------------------------------------------------------
+# Function: start_adb_shell
+# Purpose : Starts an interactive adb shell subprocess with an enlarged pipe
+#           buffer. If the kernel refuses the pipe size (pipe-max-size below
+#           PIPE_SIZE for non-root users), it falls back to the default size.
+# -----------------------------------------------------------------------------
+def start_adb_shell():
+    """Start an adb shell subprocess with binary stdin/stdout pipes"""
+    popen_args = dict(
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0  # unbuffered binary pipes, decoded once per chunk
+    )
+    try:
+        # Let adb write large outputs without stalling
+        return subprocess.Popen(['adb', 'shell'], pipesize=PIPE_SIZE, **popen_args)
+    except PermissionError:
+        return subprocess.Popen(['adb', 'shell'], **popen_args)
 
 # -----------------------------------------------------------------------------
 # Function: adb_shell_login
@@ -66,30 +373,26 @@ def save_to_log(content):
 #           The results are saved to log and printed on-screen.
 # -----------------------------------------------------------------------------
 def adb_shell_login():
-    # Start an adb shell subprocess
-    process = subprocess.Popen(
-        ['adb', 'shell'],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,  # line-buffered
-        universal_newlines=True
-    )
+    process = None
 
     # Define prompt strings
-    login_prompt = "login:"
-    password_prompt = "Password:"
+    login_prompt = b"login:"
+    password_prompt = b"Password:"
 
     # Dummy credentials for demonstration (do NOT hardcode real credentials)
     username = "your_username"
     password = "your_password"
 
-    success_prompt = "#"  # Expected shell prompt after successful login
+    success_prompt = b"#"  # Expected shell prompt after successful login
+
+    # Prompts are printed last while the shell waits for input, so only the
+    # tail of the output needs to be scanned for them
+    max_prompt = max(len(login_prompt), len(password_prompt), len(success_prompt))
+    tail_size = max_prompt * 2
 
     login_complete = False
     timeout = 3  # Maximum login wait time (in seconds)
-    start_time = time.time()
+    deadline = time.monotonic() + timeout
 
     # Variables to capture results
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -98,144 +401,137 @@ def adb_shell_login():
     command_output = ""
 
     try:
-        buffer = ''
-        while not login_complete and (time.time() - start_time) < timeout:
-            # Check if subprocess ended
-            if process.poll() is not None:
-                break
+        process = start_adb_shell()
+
+        # Read the output in bulk as it becomes available
+        reader = PipeReader(process.stdout)
 
-            # Read one character at a time (non-blocking)
-            char = process.stdout.read(1)
-            if not char:
-                time.sleep(0.1)
+        tail = bytearray()
+        shell_exited = False
+        while not login_complete and time.monotonic() < deadline:
+            # Wait until output is available, then read it in bulk
+            chunk = reader.read(max(deadline - time.monotonic(), 0))
+            if chunk is None:
                 continue
+            if not chunk:
+                shell_exited = True  # EOF: adb shell has exited
+                break
 
-            sys.stdout.write(char)  # Real-time print
-            sys.stdout.flush()
-            buffer += char
+            sys.stdout.buffer.write(chunk)  # Real-time print, one write per chunk
+            sys.stdout.buffer.flush()
+            # Keep only the tail, truncated in place
+            tail += chunk
+            if len(tail) > tail_size:
+                del tail[:-tail_size]
 
-            # Respond to login prompt
-            if login_prompt in buffer:
-                process.stdin.write(username + '\n')
-                process.stdin.flush()
-                buffer = buffer.replace(login_prompt, '')
+            # Respond to login prompt, consuming it from the tail
+            if login_prompt in tail:
+                process.stdin.write((username + '\n').encode())
+                del tail[:tail.index(login_prompt) + len(login_prompt)]
 
-            elif password_prompt in buffer:
-                process.stdin.write(password + '\n')
-                process.stdin.flush()
-                buffer = buffer.replace(password_prompt, '')
+            elif password_prompt in tail:
+                process.stdin.write((password + '\n').encode())
+                del tail[:tail.index(password_prompt) + len(password_prompt)]
 
             # If login is successful, run mount check commands
-            if success_prompt in buffer:
+            if success_prompt in tail:
                 login_complete = True
                 login_status = "Success"
-                print("\nLogin successful. Checking mount status of /mnt/emmc_mount...")
-
-                # Linux shell commands to check if mount path is mounted
-                commands = [
-                    "df -h | grep emmc_mount  || echo '/mnt/emmc_mount not found'",
-                    "mount | grep emmc_mount || echo '/mnt/emmc_mount not mounted'",
-                    "cat /proc/mounts | grep emmc_mount || true"
-                ]
-
-                all_output = ""
-                for cmd in commands:
-                    process.stdin.write(cmd + '\n')
-                    process.stdin.flush()
-
-                    # Capture each command’s output with timeout
-                    cmd_output = ""
-                    cmd_start = time.time()
-
-                    while (time.time() - cmd_start) < 3:
-                        char = process.stdout.read(1)
-                        if not char:
-                            time.sleep(0.1)
-                            continue
-
-                        sys.stdout.write(char)
-                        sys.stdout.flush()
-                        cmd_output += char
-
-                        if "#" in cmd_output:
-                            break
-
-                    all_output += f"Command: {cmd}\nOutput:\n{cmd_output}\n\n"
-
-                command_output = all_output.strip()
-
-                # Analyze whether NFS is detected in the mount information
-                nfs_patterns = [
-                    r"\bnfs\b",
-                    r"\bnfs4\b",
-                    r":[0-9]+/"
-                ]
-
-                for pattern in nfs_patterns:
-                    if re.search(pattern, command_output, re.IGNORECASE):
-                        mount_result = "Yes"
+                print("\nLogin successful. Checking mount status of /mnt/emmc_mount...", flush=True)
+
+                # Send all commands as one line so only a single round-trip is needed
+                done_marker = f"@@DONE-{os.urandom(4).hex()}@@"
+                process.stdin.write((build_batch_command(done_marker) + '\n').encode())
+
+                # Capture the batch output until the end marker or timeout
+                batch_output = bytearray()
+                done_bytes = done_marker.encode()
+                cmd_deadline = time.monotonic() + 3
+                batch_eof = False
+                scan_from = 0
+
+                while not batch_eof and time.monotonic() < cmd_deadline:
+                    chunk = reader.read(max(cmd_deadline - time.monotonic(), 0))
+                    if chunk is None:
+                        continue
+                    if not chunk:
+                        batch_eof = True
+                        break
+
+                    sys.stdout.buffer.write(chunk)
+                    sys.stdout.buffer.flush()
+                    batch_output += chunk
+
+                    # Only search the newly read bytes (plus marker overlap)
+                    if batch_output.find(done_bytes, scan_from) != -1:
                         break
-                else:
-                    if "emmc_mount" in command_output:
-                        mount_result = "No"
-                    else:
-                        mount_result = "Unknown (/mnt/emmc_mount not found)"
+                    scan_from = max(len(batch_output) - len(done_bytes) + 1, 0)
+
+                cmd_output = batch_output.decode('utf-8', errors='replace')
+                command_output = format_batch_output(cmd_output, done_marker)
+                mount_result = detect_nfs_mount(command_output)
 
                 break  # Exit main loop after execution
 
-            # Limit buffer size to keep memory usage low
-            if len(buffer) > 100:
-                buffer = buffer[-50:]
+        # Collect the exit status once if adb shell exited before login
+        if shell_exited:
+            try:
+                exit_code = process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                exit_code = "unknown"
+            print(f"\nadb shell exited before login (exit code: {exit_code})")
 
     except Exception as e:
         print(f"\nException occurred: {str(e)}")
         mount_result = f"Error: {str(e)}"
 
     finally:
-        # Ensure log directory exists
-        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
-
-        # Format and save log
-        log_content = (
-            f"[Check Time] {timestamp}\n"
-            f"[Login Status] {login_status}\n"
-            f"[NFS Mounted] {mount_result}\n\n"
-            f"[Command Output]\n{command_output}\n"
-        )
-
-        save_to_log(log_content)
-        print(f"\nCheck complete! Results saved to: {LOG_FILE}")
-
-        # Display summary
-        print("\n" + "=" * 40)
-        print(f"Time: {timestamp}")
-        print(f"Login: {login_status}")
-        print(f"NFS Mounted: {mount_result}")
-        print("=" * 40)
+        report_result(timestamp, login_status, mount_result, command_output)
 
         # Clean up process
-        if process.stdin:
-            process.stdin.close()
-        if process.poll() is None:
-            try:
-                process.terminate()
-                process.wait(timeout=1)
-            except (subprocess.TimeoutExpired, OSError):
+        if process is not None:
+            if process.stdin:
+                process.stdin.close()
+            if process.poll() is None:
                 try:
-                    process.kill()
-                except:
-                    pass
+                    process.terminate()
+                    process.wait(timeout=1)
+                except (subprocess.TimeoutExpired, OSError):
+                    try:
+                        process.kill()
+                    except:
+                        pass
+
+# -----------------------------------------------------------------------------
+# Function: run_mount_check
+# Purpose : Fails fast if no ADB device is connected, logging the check as
+#           an error; otherwise runs the mount check in the configured mode
+#           (interactive login or one-shot).
+# -----------------------------------------------------------------------------
+def run_mount_check():
+    """Check the ADB device, then run the mount check"""
+    device_error = check_adb_device()
+    if device_error:
+        print(f"ADB device not available: {device_error}")
+        report_result(
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "Failed" if ADB_LOGIN_REQUIRED else "Not required",
+            f"Error: ADB device not available ({device_error})",
+            ""
+        )
+        return
+
+    if ADB_LOGIN_REQUIRED:
+        adb_shell_login()
+    else:
+        adb_shell_oneshot()
 
 # -----------------------------------------------------------------------------
 # Entry point of the script.
-# Checks if log file exists; creates it with a header if it doesn't.
+# Opens the log file (creating it with a header if it doesn't exist).
 # Then starts the ADB login and mount check procedure.
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
-    if not os.path.exists(LOG_FILE):
-        with open(LOG_FILE, 'w') as f:
-            f.write("eMMC Mount Check Log\n")
-            f.write("=" * 80 + "\n")
-
-    adb_shell_login()
+    open_log()
+    run_mount_check()
     sys.exit()